@@ -33,7 +33,7 @@ def step(people, infected, exposed, cell_size, infect_distance, infect_rate, rec
          ):
     new_infected = []
     new_exposed = []
-    recover = []
+    recovered_num = 0
     grid = populate_grid(people, cell_size)
 
     for i in infected:
@@ -50,7 +50,7 @@ def step(people, infected, exposed, cell_size, infect_distance, infect_rate, rec
 
         # Determine if the infected person recovers or dies
         if random.random() < recover_rate:
-            recover.append(i)
+            recovered_num += 1
             i[0] = 'R'
 
     # Progress exposed individuals to infected
@@ -61,11 +61,10 @@ def step(people, infected, exposed, cell_size, infect_distance, infect_rate, rec
         else:
             new_exposed.append(e)
 
-    # Update lists
-    for r in recover:
-        infected.remove(r)
+    # Keep the people that are still infected
+    infected = [p for p in infected if p[0] == 'I']
 
-    return infected + new_infected, new_exposed, len(recover)
+    return infected + new_infected, new_exposed, recovered_num
 
 
 def move_all(people, max_move, width, height):
@@ -123,8 +122,9 @@ def create_SEIR_simulation(width=500, height=500, number_of_people=5000, num_inf
     screen = pygame.display.set_mode((width, height))
     screen.fill((0, 0, 0))  # Black background
 
-    # Simulation loop
-    frames = []
+    # Simulation loop, streaming the frames into the GIF as they are produced
+    simulation_gif_path = f"simulations/{simulation_name}_SEIR.gif"
+    writer = imageio.get_writer(simulation_gif_path, mode='I', fps=10)
     step_count = 1
     simulated_S, simulated_E, simulated_I, simulated_R = [number_of_people - num_infected], [0], [
         num_infected], [0]
@@ -145,24 +145,22 @@ def create_SEIR_simulation(width=500, height=500, number_of_people=5000, num_inf
             pygame.draw.circle(screen, color, [p[1], p[2]], 1)
 
         pygame.display.flip()
-        frame_array = pygame.surfarray.array3d(screen)
-        frames.append(np.transpose(frame_array, (1, 0, 2)))
-
-        pygame.image.save(screen, "frames/" + simulation_name + '_SEIR.png')
+        frame_bytes = pygame.image.tobytes(screen, 'RGB')
+        writer.append_data(np.frombuffer(frame_bytes, dtype=np.uint8).reshape(height, width, 3))
 
         simulated_R.append(simulated_R[-1] + recovered_amount)
         simulated_I.append(len(infected))
         simulated_E.append(len(exposed))
         simulated_S.append(number_of_people - simulated_I[-1] - simulated_E[-1] - simulated_R[-1])
 
+    writer.close()
+
+    # Keep the final frame of the simulation
+    pygame.image.save(screen, "frames/" + simulation_name + '_SEIR.png')
     pygame.quit()
 
     days = step_count
 
-    # Save simulation GIF
-    simulation_gif_path = f"simulations/{simulation_name}_SEIR.gif"
-    imageio.mimsave(simulation_gif_path, frames, fps=10)
-
     # Solve SEIR model
     t = np.linspace(0, days, days)
     initial_conditions = [simulated_S[0], simulated_E[0], simulated_I[0], simulated_R[0]]
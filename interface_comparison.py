@@ -1,75 +1,215 @@
 import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, filedialog
-from PIL import Image, ImageTk, ImageSequence
+from PIL import Image, ImageOps, ImageTk
 import os
 
+# How many decoded frames are kept in memory for each GIF
+FRAME_CACHE_SIZE = 16
+
+# Decoded frames shared by every box showing the same GIF, along with the decodes still
+# in progress: path -> (modification time, target size, frames, pending)
+_decoded_frames_cache = {}
+
+# Every label currently on screen; all of them are advanced by one shared timer
+_animated_labels = []
+
+# Delay between frames of the shared timer, in milliseconds
+FRAME_DELAY = 100
+
+# Opens and decodes GIFs away from the Tk thread. A single worker means each Pillow
+# image is only ever touched by one thread.
+_decoder = ThreadPoolExecutor(max_workers=1)
+
+
+def _shared_frames(gif_path, target_size):
+    """
+    Return the frame cache and the in-progress decodes for a GIF, shared by every label
+    that shows the same file.
+    """
+    mtime = os.path.getmtime(gif_path)
+    cached = _decoded_frames_cache.get(gif_path)
+    if cached is None or cached[:2] != (mtime, target_size):
+        # First time this GIF is loaded, or it has been regenerated or resized since
+        cached = (mtime, target_size, OrderedDict(), {})
+        _decoded_frames_cache[gif_path] = cached
+    return cached[2], cached[3]
+
 
 class AnimatedGIFLabel(tk.Label):
     """
     A Tkinter Label that plays an animated GIF using Pillow, with pause/resume/refresh support.
+    Labels do not schedule their own timers; _global_tick advances every label at once.
+    The GIF is opened and its frames decoded on a background thread, so loading never blocks
+    the window; a frame that is not decoded yet just holds the previous one for a tick.
+    Only the most recently shown frames are kept in memory. They are shared with any other
+    label playing the same file, and a label loaded while another one is already playing it
+    starts on the same frame, so the two decode each frame once between them. If target_size
+    is given, frames are scaled once on decode to fit.
     """
 
-    def __init__(self, master, gif_path, delay=100, **kwargs):
+    def __init__(self, master, gif_path, target_size=None, **kwargs):
         super().__init__(master, **kwargs)
 
         self.gif_path = gif_path
-        self.delay = delay
-        self.frames = []
+        self.target_size = target_size
         self.current_frame = 0
         self.is_paused = False  # track whether the animation is paused
-        self.after_id = None  # store the ID of the scheduled .after call
 
-        # Load all frames from the GIF using Pillow
-        pil_image = Image.open(gif_path)
-        for frame in ImageSequence.Iterator(pil_image):
-            frame_rgb = frame.convert("RGBA")
-            tk_frame = ImageTk.PhotoImage(frame_rgb)
-            self.frames.append(tk_frame)
-
-        if not self.frames:
-            raise RuntimeError(f"No frames found in the GIF: {gif_path}")
-
-        # Display the first frame
-        self.config(image=self.frames[0])
-
-        # Start the animation
-        self._schedule_next_frame()
-
-    def _schedule_next_frame(self):
-        """Schedule the animation of the next frame, unless we're paused."""
-        if not self.is_paused:
-            self.after_id = self.after(self.delay, self._animate)
-
-    def _animate(self):
-        """Move to the next frame, then schedule the subsequent one."""
-        self.current_frame = (self.current_frame + 1) % len(self.frames)
-        self.config(image=self.frames[self.current_frame])
-        self._schedule_next_frame()
+        self._pil = None  # Pillow image, only used on the decoder thread
+        self._n = None  # number of frames, known once the GIF has been opened
+        self._shown = None  # index of the frame on screen
+        # Decoded frames, and frame index -> future of the decoded frame
+        self._frames, self._pending = _shared_frames(gif_path, target_size)
+
+        # Show a placeholder until the first frame has been decoded. Frames are only
+        # requested once the GIF has opened, so a file that fails to open never leaves a
+        # broken decode for other labels to pick up.
+        self.config(text="Loading...")
+        self._opened = _decoder.submit(self._open)
+
+        # Let the shared timer animate it
+        _animated_labels.append(self)
+
+    def _open(self):
+        """Open the GIF and return its frame count. Runs on the decoder thread."""
+        self._pil = Image.open(self.gif_path)
+        return getattr(self._pil, "n_frames", 1)
+
+    def _decode(self, index):
+        """Decode one frame to a Pillow image. Runs on the decoder thread."""
+        self._pil.seek(index)
+        frame_rgb = self._pil.convert("RGBA")
+        if self.target_size is not None:
+            frame_rgb = ImageOps.contain(frame_rgb, self.target_size, Image.Resampling.BILINEAR)
+        return frame_rgb
+
+    def _close(self):
+        """Close the GIF file. Runs on the decoder thread."""
+        if self._pil is not None:
+            self._pil.close()
+
+    def _request_frame(self, index):
+        """Start decoding a frame in the background unless it is cached or on its way."""
+        if index not in self._frames and index not in self._pending:
+            self._pending[index] = _decoder.submit(self._decode, index)
+
+    def _get_frame(self, index):
+        """Return a frame as a PhotoImage, or None if it has not been decoded yet."""
+        frame = self._frames.get(index)
+        if frame is not None:
+            self._frames.move_to_end(index)
+            self._pending.pop(index, None)
+            return frame
+
+        future = self._pending.get(index)
+        if future is None or not future.done():
+            self._request_frame(index)
+            return None
+
+        del self._pending[index]
+        error = future.exception()
+        if error is not None:
+            # e.g. a truncated GIF, which opens fine but fails on its later frames
+            self._fail(error)
+            return None
+
+        # PhotoImages must be created on the Tk thread, so only this step happens here
+        frame = ImageTk.PhotoImage(future.result())
+        self._frames[index] = frame
+        if len(self._frames) > FRAME_CACHE_SIZE:
+            self._frames.popitem(last=False)  # drop the least recently used frame
+        return frame
+
+    def _show_frame(self, index):
+        """
+        Display the given frame if it is ready, holding a reference so it is not garbage
+        collected. Returns whether it was shown.
+        """
+        frame = self._get_frame(index)
+        if frame is None:
+            return False
+        self._last_img = frame
+        self._shown = index
+        self.config(image=self._last_img, text="")
+        return True
+
+    def _fail(self, error):
+        """Report a GIF that cannot be played and stop animating it."""
+        print(f"[Console] Could not open {self.gif_path}: {error}")
+        self._last_img = None
+        self.config(image="", text="Could not open this GIF")
+        if self in _animated_labels:
+            _animated_labels.remove(self)
+
+    def advance(self):
+        """Move to the next frame, unless we're paused or it is still being decoded."""
+        if not self._opened.done():
+            return
+        if self._n is None:
+            error = self._opened.exception()
+            if error is not None:
+                self._fail(error)
+                return
+            self._n = self._opened.result()
+
+            # Join any box already playing this GIF, so the two share every decoded frame
+            for other in _animated_labels:
+                if other is not self and other._frames is self._frames and other._shown is not None:
+                    self.current_frame = other.current_frame
+                    break
+
+        if self._shown != self.current_frame:
+            next_frame = self.current_frame  # first frame, or the animation was refreshed
+        elif self.is_paused:
+            return
+        else:
+            next_frame = (self.current_frame + 1) % self._n
+
+        if self._show_frame(next_frame):
+            self.current_frame = next_frame
+        elif self not in _animated_labels:
+            return  # the frame could not be decoded
+
+        # Decode the following frame while this one is on screen
+        self._request_frame((self.current_frame + 1) % self._n)
 
     def pause(self):
         """Stop advancing frames."""
-        if not self.is_paused:
-            self.is_paused = True
-            if self.after_id is not None:
-                self.after_cancel(self.after_id)
-                self.after_id = None
+        self.is_paused = True
 
     def resume(self):
         """Resume advancing frames."""
-        if self.is_paused:
-            self.is_paused = False
-            self._schedule_next_frame()
+        self.is_paused = False
 
     def refresh(self):
         """
         Restart the animation from frame 0.
         If paused, unpause it.
         """
-        self.pause()  # cancel any pending after calls
-        self.current_frame = 0  # go back to the beginning
-        self.config(image=self.frames[0])
+        self.current_frame = 0  # go back to the beginning, shown on the next tick
         self.is_paused = False  # unpause
-        self._schedule_next_frame()
+
+    def destroy(self):
+        """Stop the shared timer from animating this label once it is removed."""
+        if self in _animated_labels:
+            _animated_labels.remove(self)
+        # Pending decodes may be shared with other labels, so they are left to finish;
+        # the worker runs them before it closes the file
+        _decoder.submit(self._close)
+        super().destroy()
+
+
+def _global_tick():
+    """Schedule the next tick, then advance every label in one pass."""
+    # Scheduled first so one failing label can never stop the other boxes
+    root.after(FRAME_DELAY, _global_tick)
+    for label_obj in list(_animated_labels):
+        try:
+            label_obj.advance()
+        except Exception as e:
+            label_obj._fail(e)
 
 
 def do_fullscreen_layout():
@@ -114,6 +254,10 @@ def do_fullscreen_layout():
     canvas.coords("box4_frame", gap_x * 2 + box_width, gap_y * 2 + box_height)
     canvas.itemconfig("box4_frame", width=box_width, height=box_height)
 
+    # Remember the box size so GIFs can be scaled to fit when they are decoded
+    box_size["width"] = box_width
+    box_size["height"] = box_height
+
     # --- Parameters section on the right ---
     rect_left = gap_x * 3 + 2 * box_width
     rect_right = rect_left + param_width
@@ -133,6 +277,9 @@ def do_fullscreen_layout():
 box_gif_paths = {1: None, 2: None, 3: None, 4: None}
 box_gif_labels = {1: None, 2: None, 3: None, 4: None}
 
+# Size of each box, filled in by do_fullscreen_layout
+box_size = {"width": None, "height": None}
+
 
 def show_parameters_for_box(box_num):
     """
@@ -249,54 +396,19 @@ def load_and_display_gif(box_num, gif_path):
     # Save path in our dictionary
     box_gif_paths[box_num] = gif_path
 
-    # Clear the chosen box so we can place the new GIF
-    if box_num == 1:
-        for w in box1_frame.winfo_children():
-            w.destroy()
-        gif_label = AnimatedGIFLabel(box1_frame, gif_path, delay=100, bg="white")
-        gif_label.pack(fill="both", expand=True)
-        gif_label.bind("<Button-1>", lambda e: show_parameters_for_box(1))
-        box_gif_labels[1] = gif_label
-
-    elif box_num == 2:
-        for w in box2_frame.winfo_children():
-            w.destroy()
-        gif_label = AnimatedGIFLabel(box2_frame, gif_path, delay=100, bg="white")
-        gif_label.pack(fill="both", expand=True)
-        gif_label.bind("<Button-1>", lambda e: show_parameters_for_box(2))
-        box_gif_labels[2] = gif_label
-
-    elif box_num == 3:
-        for w in box3_frame.winfo_children():
-            w.destroy()
-        gif_label = AnimatedGIFLabel(box3_frame, gif_path, delay=100, bg="white")
-        gif_label.pack(fill="both", expand=True)
-        gif_label.bind("<Button-1>", lambda e: show_parameters_for_box(3))
-        box_gif_labels[3] = gif_label
-
-    elif box_num == 4:
-        for w in box4_frame.winfo_children():
-            w.destroy()
-        gif_label = AnimatedGIFLabel(box4_frame, gif_path, delay=100, bg="white")
-        gif_label.pack(fill="both", expand=True)
-        gif_label.bind("<Button-1>", lambda e: show_parameters_for_box(4))
-        box_gif_labels[4] = gif_label
-
-
-def on_box1_click(event):
-    show_parameters_for_box(box_num=1)
+    # Scale the frames to the box once when decoding, rather than drawing them at full size
+    target_size = None
+    if box_size["width"] is not None:
+        target_size = (box_size["width"], box_size["height"])
 
-
-def on_box2_click(event):
-    show_parameters_for_box(box_num=2)
-
-
-def on_box3_click(event):
-    show_parameters_for_box(box_num=3)
-
-
-def on_box4_click(event):
-    show_parameters_for_box(box_num=4)
+    # Clear the chosen box so we can place the new GIF
+    box_frame = box_frames[box_num]
+    for w in box_frame.winfo_children():
+        w.destroy()
+    gif_label = AnimatedGIFLabel(box_frame, gif_path, target_size=target_size, bg="white")
+    gif_label.pack(fill="both", expand=True)
+    gif_label.bind("<Button-1>", lambda e: show_parameters_for_box(box_num))
+    box_gif_labels[box_num] = gif_label
 
 
 # --------------------- MAIN APPLICATION SETUP ---------------------
@@ -335,11 +447,11 @@ canvas.create_window(0, 0, anchor="nw", window=box3_frame, tags="box3_frame")
 canvas.create_window(0, 0, anchor="nw", window=box4_frame, tags="box4_frame")
 canvas.create_window(0, 0, anchor="nw", window=parameters_frame, tags="parameters_frame")
 
+box_frames = {1: box1_frame, 2: box2_frame, 3: box3_frame, 4: box4_frame}
+
 # Bind a click on each box's Frame
-box1_frame.bind("<Button-1>", on_box1_click)
-box2_frame.bind("<Button-1>", on_box2_click)
-box3_frame.bind("<Button-1>", on_box3_click)
-box4_frame.bind("<Button-1>", on_box4_click)
+for num, frame in box_frames.items():
+    frame.bind("<Button-1>", lambda e, n=num: show_parameters_for_box(n))
 
 
 def on_initial_draw(_):
@@ -349,4 +461,7 @@ def on_initial_draw(_):
 
 
 root.bind("<Map>", on_initial_draw)
+
+# One timer animates every GIF, so all boxes stay on the same frame
+root.after(FRAME_DELAY, _global_tick)
 root.mainloop()
@@ -33,8 +33,8 @@ def step(people, infected, exposed, recovered, cell_size, infect_distance, infec
          ):
     new_infected = []
     new_exposed = []
-    new_recover = []
-    lose_immune = []
+    recovered_num = 0
+    lose_immune_num = 0
     grid = populate_grid(people, cell_size)
 
     for i in infected:
@@ -51,7 +51,7 @@ def step(people, infected, exposed, recovered, cell_size, infect_distance, infec
 
         # Determine if the infected person recovers or dies
         if random.random() < recover_rate:
-            new_recover.append(i)
+            recovered_num += 1
             recovered.append(i)
             i[0] = 'R'
 
@@ -66,14 +66,12 @@ def step(people, infected, exposed, recovered, cell_size, infect_distance, infec
     for r in recovered:
         if random.random() < lose_immunity_rate:
             r[0] = 'S'
-            lose_immune.append(r)
-    # Update lists
-    for r in new_recover:
-        infected.remove(r)
-    for s in lose_immune:
-        recovered.remove(s)
+            lose_immune_num += 1
+    # Update lists, keeping only the people still in each state
+    infected = [p for p in infected if p[0] == 'I']
+    recovered[:] = [p for p in recovered if p[0] == 'R']
 
-    return infected + new_infected, new_exposed, len(new_recover), len(lose_immune)
+    return infected + new_infected, new_exposed, recovered_num, lose_immune_num
 
 
 def move_all(people, max_move, width, height):
@@ -132,8 +130,9 @@ def create_SEIRS_simulation(width=500, height=500, number_of_people=5000, num_in
     screen = pygame.display.set_mode((width, height))
     screen.fill((0, 0, 0))  # Black background
 
-    # Simulation loop
-    frames = []
+    # Simulation loop, streaming the frames into the GIF as they are produced
+    simulation_gif_path = f"simulations/{simulation_name}_SEIRS.gif"
+    writer = imageio.get_writer(simulation_gif_path, mode='I', fps=10)
     step_count = 1
     simulated_S, simulated_E, simulated_I, simulated_R = [number_of_people - num_infected], [0], [
         num_infected], [0]
@@ -156,24 +155,22 @@ def create_SEIRS_simulation(width=500, height=500, number_of_people=5000, num_in
             pygame.draw.circle(screen, color, [p[1], p[2]], 1)
 
         pygame.display.flip()
-        frame_array = pygame.surfarray.array3d(screen)
-        frames.append(np.transpose(frame_array, (1, 0, 2)))
-
-        pygame.image.save(screen, "frames/" + simulation_name + '_SEIRS.png')
+        frame_bytes = pygame.image.tobytes(screen, 'RGB')
+        writer.append_data(np.frombuffer(frame_bytes, dtype=np.uint8).reshape(height, width, 3))
 
         simulated_R.append(len(recovered))
         simulated_I.append(len(infected))
         simulated_E.append(len(exposed))
         simulated_S.append(number_of_people - simulated_I[-1] - simulated_E[-1] - simulated_R[-1])
 
+    writer.close()
+
+    # Keep the final frame of the simulation
+    pygame.image.save(screen, "frames/" + simulation_name + '_SEIRS.png')
     pygame.quit()
 
     days = step_count
 
-    # Save simulation GIF
-    simulation_gif_path = f"simulations/{simulation_name}_SEIRS.gif"
-    imageio.mimsave(simulation_gif_path, frames, fps=10)
-
     # Solve SEIR model
     t = np.linspace(0, days, days)
     initial_conditions = [simulated_S[0], simulated_E[0], simulated_I[0], simulated_R[0]]
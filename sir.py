@@ -1,20 +1,38 @@
 import math
-import random
+from concurrent.futures import ThreadPoolExecutor
 import imageio as imageio
+import numba
 import pygame
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation, PillowWriter
+from PIL import Image
 from scipy.integrate import odeint
 
+# Person states, stored in a uint8 array next to the x and y position arrays
+SUSCEPTIBLE, INFECTED, RECOVERED = 0, 1, 2
+# Dot color for each state, indexed by the state value
+STATE_COLORS = np.array([(0, 0, 255), (255, 0, 0), (0, 255, 0)], dtype=np.uint8)
+
+# Random generator for moving people around
+rng = np.random.default_rng()
 
-def sir_model(y, t, beta, gamma, radius, dimensions):
-    S, I, R = y
 
+def get_circle_probability(radius, width, height):
     # probability any given person is within infection radius
-    circle_probability = (math.pi * float(radius) * float(radius)) / float(dimensions[0] * dimensions[1])
+    return (math.pi * float(radius) * float(radius)) / float(width * height)
+
+
+def get_log_escape(beta):
+    # log of the chance one nearby infected person does not infect someone
+    return math.log1p(-beta) if beta < 1 else -math.inf
+
+
+def sir_model(y, t, log_escape, gamma, circle_probability):
+    S, I, R = y
+
     # recalculated beta based on the amount of infected people and probability
-    accurate_beta = (1 - ((1 - beta) ** (circle_probability * I)))
+    accurate_beta = -math.expm1(circle_probability * I * log_escape)
 
     # expected change in populations in a timeframe (1 day)
     dS_dt = -accurate_beta * S
@@ -24,6 +42,18 @@ def sir_model(y, t, beta, gamma, radius, dimensions):
     return [dS_dt, dI_dt, dR_dt]
 
 
+def sir_jacobian(y, t, log_escape, gamma, circle_probability):
+    S, I, R = y
+
+    accurate_beta = -math.expm1(circle_probability * I * log_escape)
+    # derivative of accurate_beta with respect to the infected population
+    d_beta_dI = -(1 - accurate_beta) * circle_probability * log_escape
+
+    return [[-accurate_beta, -d_beta_dI * S, 0],
+            [accurate_beta, d_beta_dI * S - gamma, 0],
+            [0, gamma, 0]]
+
+
 # Function to simulate and visualize the SIR model
 def graph_sir(S0, I0, R0, beta, gamma, days, S_sim, I_sim, R_sim, width, height, radius):
     # Initial conditions: S0 (Susceptible), I0 (Infected), R0 (Recovered)
@@ -33,7 +63,9 @@ def graph_sir(S0, I0, R0, beta, gamma, days, S_sim, I_sim, R_sim, width, height,
     t = np.linspace(0, days, days)
 
     # Solving the SIR model differential equations
-    solution = odeint(sir_model, initial_conditions, t, args=(beta, gamma, radius, (width, height)))
+    solution = odeint(sir_model, initial_conditions, t,
+                      args=(get_log_escape(beta), gamma, get_circle_probability(radius, width, height)),
+                      Dfun=sir_jacobian if beta < 1 else None)
     S, I, R = solution.T
 
     # Plotting the results
@@ -55,6 +87,11 @@ def graph_sir(S0, I0, R0, beta, gamma, days, S_sim, I_sim, R_sim, width, height,
 
 
 def animate_and_save_sir(days, S_sim, I_sim, R_sim, S_model, I_model, R_model, gif_path):
+    # Work on NumPy arrays so every frame only slices views of the data
+    S_sim, I_sim, R_sim, S_model, I_model, R_model = (
+        np.asarray(v) for v in (S_sim, I_sim, R_sim, S_model, I_model, R_model))
+    xs = np.arange(len(S_sim))
+
     fig, ax = plt.subplots(figsize=(6, 4))
 
     sim_lines = {
@@ -78,12 +115,12 @@ def animate_and_save_sir(days, S_sim, I_sim, R_sim, S_model, I_model, R_model, g
 
     # Update function for animation
     def update(frame):
-        sim_lines['S'].set_data(range(frame), S_sim[:frame])
-        sim_lines['I'].set_data(range(frame), I_sim[:frame])
-        sim_lines['R'].set_data(range(frame), R_sim[:frame])
-        model_lines['S'].set_data(range(frame), S_model[:frame])
-        model_lines['I'].set_data(range(frame), I_model[:frame])
-        model_lines['R'].set_data(range(frame), R_model[:frame])
+        sim_lines['S'].set_data(xs[:frame], S_sim[:frame])
+        sim_lines['I'].set_data(xs[:frame], I_sim[:frame])
+        sim_lines['R'].set_data(xs[:frame], R_sim[:frame])
+        model_lines['S'].set_data(xs[:frame], S_model[:frame])
+        model_lines['I'].set_data(xs[:frame], I_model[:frame])
+        model_lines['R'].set_data(xs[:frame], R_model[:frame])
         return (*sim_lines.values(), *model_lines.values())
 
     ani = FuncAnimation(fig, update, frames=len(S_sim), blit=True, interval=100)
@@ -92,17 +129,99 @@ def animate_and_save_sir(days, S_sim, I_sim, R_sim, S_model, I_model, R_model, g
     print(f"Animation saved as {gif_path}")
 
 
+# Helper functions
+def draw_people(screen, state, x, y):
+    # Write the dots straight into the screen pixels. Each person is the 2x2 block that
+    # pygame.draw.circle fills for a radius of 1, listed person by person so later people
+    # are drawn on top just like before
+    dot_x = (x[:, None] + [-1, 0, -1, 0]).ravel()
+    dot_y = (y[:, None] + [-1, -1, 0, 0]).ravel()
+    pixels = pygame.surfarray.pixels3d(screen)
+    pixels[dot_x, dot_y] = np.repeat(STATE_COLORS[state], 4, axis=0)
+    del pixels  # unlock the screen surface
+
+
+@numba.njit(cache=True)
+def build_grid(x, y, cell_size, ncols, nrows):
+    # Bucket people into grid cells: order lists people sorted by cell, and the people
+    # in cell c are order[starts[c]:starts[c] + counts[c]]
+    cell_id = (x // cell_size) * nrows + (y // cell_size)
+    order = np.argsort(cell_id, kind='mergesort')
+    counts = np.bincount(cell_id, minlength=ncols * nrows)
+    starts = np.concatenate((np.zeros(1, dtype=np.int64), np.cumsum(counts)))
+    return order, starts, counts
+
+
+@numba.njit(cache=True, fastmath=True)
+def step(state, x, y, width, height, infect_distance, infect_rate, recover_rate):
+    # Cells at least as wide as the infection distance, so only neighboring cells need checking
+    cell_size = int(math.ceil(infect_distance))
+    ncols, nrows = width // cell_size + 1, height // cell_size + 1
+    order, starts, counts = build_grid(x, y, cell_size, ncols, nrows)
+    infected = np.flatnonzero(state == INFECTED)
+    distance_sq = infect_distance * infect_distance
+
+    for i in infected:
+        cell_x, cell_y = x[i] // cell_size, y[i] // cell_size
+        # Check the current cell and neighboring cells
+        for nx in range(max(cell_x - 1, 0), min(cell_x + 2, ncols)):
+            for ny in range(max(cell_y - 1, 0), min(cell_y + 2, nrows)):
+                cell = nx * nrows + ny
+                for k in range(starts[cell], starts[cell] + counts[cell]):
+                    p = order[k]
+                    if state[p] == SUSCEPTIBLE:
+                        x_diff, y_diff = x[i] - x[p], y[i] - y[p]
+                        if x_diff * x_diff + y_diff * y_diff < distance_sq and np.random.random() < infect_rate:
+                            state[p] = INFECTED
+
+    # Determine if the infected people recover
+    recovered_num = 0
+    for i in infected:
+        if np.random.random() < recover_rate:
+            state[i] = RECOVERED
+            recovered_num += 1
+
+    return recovered_num
+
+
+def move_all(x, y, max_move, width, height):
+    # Move everyone in place, then keep them inside the screen
+    x += rng.integers(-max_move, max_move + 1, size=len(x), dtype=np.int32)
+    y += rng.integers(-max_move, max_move + 1, size=len(y), dtype=np.int32)
+    np.clip(x, 1, width - 1, out=x)
+    np.clip(y, 1, height - 1, out=y)
+
+
+class PaletteGifWriter:
+    # Saves frames as a GIF using one fixed palette: the black background plus the state
+    # colors. Frames never contain any other color, so each one maps straight onto the
+    # palette instead of Pillow working out a new palette for every frame.
+    def __init__(self, path, fps=10):
+        self.path = path
+        self.duration = 1000 // fps
+        self.frames = []
+        self.palette = Image.new("P", (1, 1))
+        self.palette.putpalette([0, 0, 0] + STATE_COLORS.ravel().tolist())
+
+    def append_data(self, frame):
+        self.frames.append(Image.fromarray(frame).quantize(palette=self.palette, dither=Image.Dither.NONE))
+
+    def close(self):
+        self.frames[0].save(self.path, save_all=True, append_images=self.frames[1:],
+                            duration=self.duration, optimize=False)
+
+
 def create_SIR_simulation(width=500, height=500, number_of_people=5000, num_infected=400, infect_rate=0.8,
-                          recover_rate=0.15, infect_distance=10, max_move=5, max_days=100, simulation_name='simulation1'):
-    people = []
-    infected = []
+                          recover_rate=0.15, infect_distance=10, max_move=5, max_days=100, simulation_name='simulation1',
+                          output_format='gif'):
+    if output_format not in ("gif", "mp4"):
+        raise ValueError(f"output_format must be 'gif' or 'mp4', not {output_format!r}")
 
-    for _ in range(number_of_people):
-        person = ["I" if random.random() < num_infected / number_of_people else "S",
-                  random.randint(0, width), random.randint(0, height)]
-        if person[0] == "I":
-            infected.append(person)
-        people.append(person)
+    # Start everyone inside the same bounds move_all keeps them in
+    x = np.random.randint(1, width, number_of_people, dtype=np.int32)
+    y = np.random.randint(1, height, number_of_people, dtype=np.int32)
+    state = np.where(np.random.rand(number_of_people) < num_infected / number_of_people,
+                     INFECTED, SUSCEPTIBLE).astype(np.uint8)
 
     pygame.init()
     screen = pygame.display.set_mode((width, height))
@@ -110,108 +229,56 @@ def create_SIR_simulation(width=500, height=500, number_of_people=5000, num_infe
     # Fill the screen with a background color (optional)
     screen.fill((0, 0, 0))  # Black background
 
-    for p in people:
-        # Draw the dot
-        pygame.draw.circle(screen, (255, 0, 0) if p[0] == "I" else (0, 0, 255) if p[0] == 'S' else (0, 255, 0),
-                           [p[1], p[2]], 1)
+    draw_people(screen, state, x, y)
 
     # Update the display
     pygame.display.flip()
 
-    def find_distance(p1, p2):
-        x_diff = p1[1] - p2[1]
-        y_diff = p1[2] - p2[2]
-        return ((x_diff ** 2) + (y_diff ** 2)) ** 0.5
-
-    def get_cell(x, y, cell_size):
-        # Get the cell coordinates based on the person's position.
-        return x // cell_size, y // cell_size
-
-    def populate_grid(people, cell_size):
-        # Organize people into a grid based on their positions.
-        grid = {}
-        for p in people:
-            cell = get_cell(p[1], p[2], cell_size)
-            if cell not in grid:
-                grid[cell] = []
-            grid[cell].append(p)
-        return grid
-
-    def step(people, infected, cell_size):
-        new_infected = []
-        recover = []
-        grid = populate_grid(people, cell_size)
-
-        for i in infected:
-            cell = get_cell(i[1], i[2], cell_size)
-            # Check the current cell and neighboring cells
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    neighbor_cell = (cell[0] + dx, cell[1] + dy)
-                    if neighbor_cell in grid:
-                        for p in grid[neighbor_cell]:
-                            if p[0] == 'S' and find_distance(i, p) < infect_distance:
-                                if random.random() < infect_rate:
-                                    p[0] = 'I'
-                                    new_infected.append(p)
-
-            # Determine if the infected person recovers
-            if random.random() < recover_rate:
-                recover.append(i)
-                i[0] = 'R'
-        recovered_num = len(recover)
-        # Remove recovered people from infected list
-        for r in recover:
-            infected.remove(r)
-
-        return infected + new_infected, recovered_num
-
-    def move_all(people):
-        for p in people:
-            p[1] += random.randint(max_move * -1, max_move)
-            if p[1] < 1:
-                p[1] = 1
-            if p[1] > width - 1:
-                p[1] = width - 1
-            p[2] += random.randint(max_move * -1, max_move)
-            if p[2] < 1:
-                p[2] = 1
-            if p[2] > height - 1:
-                p[2] = height - 1
-
-    frames = []
+    # Stream the frames into the video as they are produced. GIF is what the comparison
+    # viewer plays; MP4 is much smaller and quicker to encode.
+    output_path = "simulations/" + simulation_name + "_SIR." + output_format
+    if output_format == "mp4":
+        writer = imageio.get_writer(output_path, format='FFMPEG', mode='I', fps=10,
+                                    codec='libx264', pixelformat='yuv420p', macro_block_size=2)
+    else:
+        writer = PaletteGifWriter(output_path, fps=10)
     step_count = 0
     simulated_S, simulated_I, simulated_R = [number_of_people - num_infected], [num_infected], [0]
-    while len(infected) > 0 and step_count <= max_days:
+    while np.any(state == INFECTED) and step_count <= max_days:
         step_count += 1
         screen.fill((0, 0, 0))
-        infected, recovered_amount = step(people, infected, infect_distance)
-        move_all(people)
-        for p in people:
-            pygame.draw.circle(screen, (255, 0, 0) if p[0] == "I" else (0, 0, 255) if p[0] == 'S' else (0, 255, 0),
-                               [p[1], p[2]], 1)
+        recovered_amount = step(state, x, y, width, height, infect_distance, infect_rate, recover_rate)
+        move_all(x, y, max_move, width, height)
+        draw_people(screen, state, x, y)
 
         pygame.display.flip()
-        frame_array = pygame.surfarray.array3d(screen)  # Capture the frame
-        frames.append(np.transpose(frame_array, (1, 0, 2)))  # Transpose for (height, width, color)
+        frame_bytes = pygame.image.tobytes(screen, 'RGB')  # Capture the frame as (height, width, color)
+        writer.append_data(np.frombuffer(frame_bytes, dtype=np.uint8).reshape(height, width, 3))
 
         simulated_R.append(simulated_R[-1] + recovered_amount)
-        simulated_I.append(len(infected))
+        simulated_I.append(int(np.count_nonzero(state == INFECTED)))
         simulated_S.append(number_of_people - simulated_I[-1] - simulated_R[-1])
-        pygame.image.save(screen, "frames/" + simulation_name + '_SIR.png')
 
-    # Convert the frames to a video or GIF using imageio
-    output_gif_path = "simulations/" + simulation_name + "_SIR.gif"
-    imageio.mimsave(output_gif_path, frames, fps=10)
-    print(f"Saved simulation as {output_gif_path}")
+    # Keep the final frame of the simulation
+    pygame.image.save(screen, "frames/" + simulation_name + '_SIR.png')
+
+    # Finish encoding in the background while the model curves are solved and drawn
+    encoder = ThreadPoolExecutor(max_workers=1)
+    video_saved = encoder.submit(writer.close)
 
     S0, I0, R0 = number_of_people - num_infected, num_infected, 0
     initial_conditions = [S0, I0, R0]
     t = np.linspace(0, step_count + 1, step_count + 1)
-    solution = odeint(sir_model, initial_conditions, t, args=(infect_rate, recover_rate, infect_distance, (width, height)))
+    solution = odeint(sir_model, initial_conditions, t,
+                      args=(get_log_escape(infect_rate), recover_rate, get_circle_probability(infect_distance, width, height)),
+                      Dfun=sir_jacobian if infect_rate < 1 else None)
     S_model, I_model, R_model = solution.T
 
     graph_gif_path = "graphs/" + simulation_name + "SIR_graph.gif"
     animate_and_save_sir(step_count + 1, simulated_S, simulated_I, simulated_R, S_model, I_model, R_model, graph_gif_path)
 
+    video_saved.result()
+    encoder.shutdown()
+    print(f"Saved simulation as {output_path}")
+
     pygame.quit()
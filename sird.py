@@ -32,8 +32,8 @@ def populate_grid(people, cell_size):
 def step(people, infected, cell_size, infect_distance, infect_rate, recover_rate,
          mortality_rate):
     new_infected = []
-    recover = []
-    deaths = []
+    recovered_num = 0
+    deaths_num = 0
     grid = populate_grid(people, cell_size)
 
     for i in infected:
@@ -50,19 +50,16 @@ def step(people, infected, cell_size, infect_distance, infect_rate, recover_rate
 
         # Determine if the infected person recovers or dies
         if random.random() < recover_rate:
-            recover.append(i)
+            recovered_num += 1
             i[0] = 'R'
         elif random.random() < mortality_rate:
-            deaths.append(i)
+            deaths_num += 1
             i[0] = 'D'
 
-    # Update lists
-    for r in recover:
-        infected.remove(r)
-    for d in deaths:
-        infected.remove(d)
+    # Keep the people that are still infected
+    infected = [p for p in infected if p[0] == 'I']
 
-    return infected + new_infected, len(recover), len(deaths)
+    return infected + new_infected, recovered_num, deaths_num
 
 
 def move_all(people, max_move, width, height):
@@ -116,8 +113,9 @@ def create_SIRD_simulation(width=500, height=500, number_of_people=5000, num_inf
     screen = pygame.display.set_mode((width, height))
     screen.fill((0, 0, 0))  # Black background
 
-    # Simulation loop
-    frames = []
+    # Simulation loop, streaming the frames into the GIF as they are produced
+    simulation_gif_path = f"simulations/{simulation_name}_SIRD.gif"
+    writer = imageio.get_writer(simulation_gif_path, mode='I', fps=10)
     step_count = 1
     simulated_S, simulated_I, simulated_R, simulated_D = [number_of_people - num_infected], [
         num_infected], [0], [0]
@@ -140,24 +138,22 @@ def create_SIRD_simulation(width=500, height=500, number_of_people=5000, num_inf
             pygame.draw.circle(screen, color, [p[1], p[2]], 1)
 
         pygame.display.flip()
-        frame_array = pygame.surfarray.array3d(screen)
-        frames.append(np.transpose(frame_array, (1, 0, 2)))
-
-        pygame.image.save(screen, "frames/" + simulation_name + '_SIRD.png')
+        frame_bytes = pygame.image.tobytes(screen, 'RGB')
+        writer.append_data(np.frombuffer(frame_bytes, dtype=np.uint8).reshape(height, width, 3))
 
         simulated_R.append(simulated_R[-1] + recovered_amount)
         simulated_D.append(simulated_D[-1] + deaths_amount)
         simulated_I.append(len(infected))
         simulated_S.append(number_of_people - simulated_I[-1] - simulated_R[-1] - simulated_D[-1])
 
+    writer.close()
+
+    # Keep the final frame of the simulation
+    pygame.image.save(screen, "frames/" + simulation_name + '_SIRD.png')
     pygame.quit()
 
     days = step_count
 
-    # Save simulation GIF
-    simulation_gif_path = f"simulations/{simulation_name}_SIRD.gif"
-    imageio.mimsave(simulation_gif_path, frames, fps=10)
-
     # Solve SIRD model
     t = np.linspace(0, days, days)
     initial_conditions = [simulated_S[0], simulated_I[0], simulated_R[0], simulated_D[0]]